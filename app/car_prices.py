@@ -1,71 +1,361 @@
-import psycopg2
-import configparser
-from datetime import datetime
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
 import re
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 import numpy as np
 
-def load_postgres_configurations():
-    config = configparser.ConfigParser()
-    config.read('../application.properties')
-    return {
-        'host': config.get('postgres', 'host'),
-        'port': config.get('postgres', 'port'),
-        'user': config.get('postgres', 'user'),
-        'password': config.get('postgres', 'passwd'),
-        'database': config.get('postgres', 'db')
-    }
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import database
+except ImportError:
+    from app import database
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DRIVER_PATH_CACHE = os.path.join(script_dir, '../.cache/chromedriver_path')
 
-def connect_to_database(config):
+# Hosts and resource types the price pages don't need to render the result badges
+BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*.mp4', '*.webm', '*.mp3',
+    '*doubleclick.net*', '*googlesyndication.com*', '*google-analytics.com*',
+    '*googletagmanager.com*', '*googletagservices.com*', '*facebook.net*',
+    '*facebook.com/tr*', '*adnxs.com*', '*amazon-adsystem.com*', '*criteo.com*',
+    '*scorecardresearch.com*', '*hotjar.com*', '*quantserve.com*', '*taboola.com*',
+]
+MAX_PAGES_PER_DRIVER = 50
+MAX_DRIVER_RSS_MB = 1024
+
+SCHEDULE_STATE_PATH = os.path.join(script_dir, '../.cache/scrape_schedule.json')
+# Models that came back with "No Data" are retried sooner than the 6 month refresh of priced models
+NO_DATA_RETRY_TTL = timedelta(days=7)
+
+SCRAPE_WAIT_SECONDS = 20
+PRICE_SELECTOR = "div.badge__label.label--price"
+MILEAGE_SELECTOR = ".info.mileageDate span.mileage"
+# Message the results page renders once a search has finished with zero listings; only this
+# counts as "no listings", a page that is still loading results when the wait expires does not
+NO_RESULTS_SELECTOR = ".no-results, .results-empty, [data-testid='no-results']"
+
+def connect_to_database():
     try:
-        return psycopg2.connect(**config)
+        return database.get_postgres_connection()
     except Exception as e:
         print(f"Database connection failed: {e}")
         return None
 
 def fetch_auction_data(connection):
+    """
+    Stale (make, model, year) combinations with upcoming auctions, ordered so the
+    nearest auction comes first and, within a date, the models covering the most lots.
+    """
     cursor = connection.cursor()
     today = datetime.now().strftime('%Y-%m-%d')
     query = """
-    SELECT DISTINCT d."Make", d."Model", d."Model Year" AS year
+    SELECT d."Make", d."Model", d."Model Year" AS year,
+           MIN(s."auction_date") AS next_auction_date,
+           COUNT(DISTINCT s."vin") AS lot_count
     FROM "auction_list_decoded" d
     JOIN "auction_list_staging" s ON d."vin" = s."vin"
     LEFT JOIN car_aggregates a ON (d."Make" = a.make AND d."Model" = a.model AND d."Model Year" = a.year)
     WHERE s."auction_date" >= %s AND (a.last_updated IS NULL OR a.last_updated < CURRENT_DATE - INTERVAL '6 months')
+    GROUP BY d."Make", d."Model", d."Model Year"
+    ORDER BY next_auction_date, lot_count DESC
     """
     cursor.execute(query, (today,))
     return cursor.fetchall()
 
+def parse_budget(budget):
+    """Parse a time budget like '30m', '2h', '90s' or a bare number of minutes into seconds."""
+    if budget is None:
+        return None
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*', str(budget).lower())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid budget '{budget}', expected e.g. 30m, 2h or 900s")
+    value, unit = float(match.group(1)), match.group(2) or 'm'
+    return value * {'s': 1, 'm': 60, 'h': 3600}[unit]
+
+def car_key(make, model, year):
+    return f"{make}|{model}|{year}"
+
+def load_schedule_state(path=SCHEDULE_STATE_PATH):
+    if not os.path.exists(path):
+        return {'pending': [], 'no_data': {}}
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable schedule state {path}: {e}")
+        return {'pending': [], 'no_data': {}}
+    state.setdefault('pending', [])
+    state.setdefault('no_data', {})
+    return state
+
+def save_schedule_state(state, path=SCHEDULE_STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(state, f, indent=4, default=str)
+
+def build_work_queue(cars, state, now=None):
+    """
+    Merge freshly fetched cars with work left over from the previous run, drop models
+    whose "No Data" result is still within NO_DATA_RETRY_TTL, and order by
+    (nearest auction date, most lots). Each entry is [make, model, year, auction_date, lot_count].
+    """
+    now = now or datetime.now()
+    queue = {}
+    for entry in state['pending']:
+        make, model, year, auction_date, lot_count = entry
+        queue[car_key(make, model, year)] = [make, model, year, str(auction_date), int(lot_count)]
+    # Fresh rows win over carried-over ones so dates and lot counts are current
+    for make, model, year, auction_date, lot_count in cars:
+        queue[car_key(make, model, year)] = [make, model, year, str(auction_date), int(lot_count)]
+
+    work = []
+    for key, entry in queue.items():
+        retried_at = state['no_data'].get(key)
+        if retried_at and now < no_data_retry_at(retried_at, entry[3]):
+            continue
+        work.append(entry)
+    today = now.strftime('%Y-%m-%d')
+    work = [entry for entry in work if entry[3][:10] >= today]
+    work.sort(key=lambda entry: (entry[3], -entry[4]))
+    return work
+
+def no_data_retry_at(retried_at, auction_date):
+    """
+    When a "No Data" model becomes eligible again: NO_DATA_RETRY_TTL after the last
+    attempt, but no later than the day before its next auction.
+    """
+    retry_at = datetime.fromisoformat(retried_at) + NO_DATA_RETRY_TTL
+    day_before_auction = datetime.fromisoformat(str(auction_date)[:10]) - timedelta(days=1)
+    return min(retry_at, day_before_auction)
+
+def store_car_data(data):
+    """Insert one scrape result on a freshly checked-out pooled connection, then hand it back."""
+    connection = database.get_postgres_connection()
+    try:
+        insert_car_data(connection, data)
+    finally:
+        connection.close()
+
+def run_schedule(drivers, cars, budget_seconds=None, state_path=SCHEDULE_STATE_PATH):
+    """
+    Scrape the queue in priority order until it is empty or the time budget runs out.
+    Whatever is left is saved to `state_path` and picked up first by the next run.
+    Each result is stored on its own pool checkout so long runs get pre-ping/recycle health checks.
+    """
+    state = load_schedule_state(state_path)
+    queue = build_work_queue(cars, state)
+    deadline = time.monotonic() + budget_seconds if budget_seconds is not None else None
+    durations = []
+
+    done = 0
+    try:
+        for make, model, year, auction_date, lot_count in queue:
+            # Stop before starting a lookup that probably won't finish in time
+            expected = float(np.median(durations)) if durations else 0
+            if deadline is not None and time.monotonic() + expected > deadline:
+                break
+            start = time.monotonic()
+            data = scrape_data(drivers, make, model, year)
+            drivers.after_page()
+            durations.append(time.monotonic() - start)
+            print(data)
+            store_car_data(data)
+
+            key = car_key(make, model, year)
+            if data['median_price'] != 'No Data':
+                state['no_data'].pop(key, None)
+            elif data['no_listings']:
+                # Only a page that loaded without any listings counts, failed scrapes are retried next run
+                state['no_data'][key] = datetime.now().isoformat()
+            done += 1
+    finally:
+        # Save even if a scrape or insert blew up so the rest of the queue carries over
+        state['pending'] = queue[done:]
+        # Forget negative results that have expired, they'll come back through the query
+        now = datetime.now()
+        state['no_data'] = {key: ts for key, ts in state['no_data'].items()
+                            if now - datetime.fromisoformat(ts) < NO_DATA_RETRY_TTL}
+        save_schedule_state(state, state_path)
+        print(f"Scraped {done} of {len(queue)} models, {len(state['pending'])} left for the next run.")
+    return done
 
-def setup_selenium():
-    service = Service(ChromeDriverManager().install())
+def get_chromedriver_path(refresh=False):
+    """
+    Return the chromedriver binary, resolving it through ChromeDriverManager only on a
+    cache miss or when `refresh` is set (e.g. Chrome updated past the cached driver).
+    """
+    if refresh and os.path.exists(DRIVER_PATH_CACHE):
+        os.remove(DRIVER_PATH_CACHE)
+    if os.path.exists(DRIVER_PATH_CACHE):
+        with open(DRIVER_PATH_CACHE) as f:
+            cached_path = f.read().strip()
+        if cached_path and os.path.exists(cached_path):
+            return cached_path
+
+    driver_path = ChromeDriverManager().install()
+    os.makedirs(os.path.dirname(DRIVER_PATH_CACHE), exist_ok=True)
+    with open(DRIVER_PATH_CACHE, 'w') as f:
+        f.write(driver_path)
+    return driver_path
+
+def build_chrome_options(lean=True):
     options = webdriver.ChromeOptions()
     options.add_argument("--headless")
-    driver = webdriver.Chrome(service=service, options=options)
+    if lean:
+        options.page_load_strategy = 'eager'
+        options.add_argument("--disable-extensions")
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.media_stream": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+    return options
+
+def setup_selenium(lean=True):
+    options = build_chrome_options(lean)
+    try:
+        driver = webdriver.Chrome(service=Service(get_chromedriver_path()), options=options)
+    except SessionNotCreatedException as e:
+        # The cached chromedriver no longer matches the installed Chrome, fetch a matching one and retry once
+        print(f"Cached chromedriver rejected, reinstalling: {e.msg}")
+        driver = webdriver.Chrome(service=Service(get_chromedriver_path(refresh=True)), options=options)
+    if lean:
+        # Block media and third-party ad/tracker hosts at the network layer
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS})
     return driver
 
+def driver_rss_mb(driver):
+    """Resident memory of chromedriver plus every Chrome process it spawned, in MB."""
+    if psutil is None:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+    except (AttributeError, psutil.Error):
+        return None
+
+    rss = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return rss / (1024 * 1024)
+
+class DriverManager:
+    """
+    Hands out a Chrome driver and transparently replaces it after `max_pages`
+    page loads or once the browser's RSS exceeds `max_rss_mb`.
+    Also records page-load times and peak RSS for the run.
+    """
+
+    def __init__(self, lean=True, max_pages=MAX_PAGES_PER_DRIVER, max_rss_mb=MAX_DRIVER_RSS_MB):
+        self.lean = lean
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.driver = None
+        self.pages_loaded = 0
+        self.recycle_count = 0
+        self.load_times = []
+        self.peak_rss_mb = 0.0
+
+    def get_driver(self):
+        if self.driver is None:
+            self.driver = setup_selenium(self.lean)
+            self.pages_loaded = 0
+        return self.driver
+
+    def load(self, url):
+        driver = self.get_driver()
+        start = time.perf_counter()
+        driver.get(url)
+        self.load_times.append(time.perf_counter() - start)
+        self.pages_loaded += 1
+        return driver
+
+    def after_page(self):
+        """Sample memory and recycle the driver if it has hit its page or RSS limit."""
+        if self.driver is None:
+            return
+        rss = driver_rss_mb(self.driver)
+        if rss is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb, rss)
+        if self.pages_loaded >= self.max_pages or (rss is not None and rss >= self.max_rss_mb):
+            print(f"Recycling driver after {self.pages_loaded} pages (RSS: {rss} MB)")
+            self.quit()
+            self.recycle_count += 1
+
+    def quit(self):
+        if self.driver is not None:
+            self.driver.quit()
+            self.driver = None
+
+    def stats(self):
+        return {
+            'profile': 'lean' if self.lean else 'default',
+            'pages': len(self.load_times),
+            'mean_load_seconds': round(float(np.mean(self.load_times)), 3) if self.load_times else 'No Data',
+            'median_load_seconds': round(float(np.median(self.load_times)), 3) if self.load_times else 'No Data',
+            'peak_rss_mb': round(self.peak_rss_mb, 1) if psutil is not None else 'No Data',
+            'recycles': self.recycle_count,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.quit()
+
 def format_url_part(text):
     """Normalize text for URL: remove special characters, spaces, convert to lower."""
     return re.sub(r'\W+', '', text).lower()
 
 def scrape_data(driver, make, model, year):
+    """`driver` may be a plain WebDriver or a DriverManager; the latter times the page load."""
     formatted_make = format_url_part(make)
     formatted_model = format_url_part(model)
     url = f"https://www.autotempest.com/results?make={formatted_make}&model={formatted_model}&zip=10706&localization=country&minyear={year}&maxyear={year}"
-    driver.get(url)
+    if isinstance(driver, DriverManager):
+        driver = driver.load(url)
+    else:
+        driver.get(url)
+    no_listings = False
     try:
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.badge__label.label--price"))
-        )
-        price_elements = driver.find_elements(By.CSS_SELECTOR, "div.badge__label.label--price")
+        WebDriverWait(driver, SCRAPE_WAIT_SECONDS).until(EC.any_of(
+            EC.presence_of_all_elements_located((By.CSS_SELECTOR, PRICE_SELECTOR)),
+            EC.presence_of_element_located((By.CSS_SELECTOR, NO_RESULTS_SELECTOR))
+        ))
+        price_elements = driver.find_elements(By.CSS_SELECTOR, PRICE_SELECTOR)
         prices = [int(price.text.strip('$').replace(',', '')) if price.text.strip('$').replace(',', '').isdigit() else 'N/A' for price in price_elements]
-        mileage_elements = driver.find_elements(By.CSS_SELECTOR, ".info.mileageDate span.mileage")
+        mileage_elements = driver.find_elements(By.CSS_SELECTOR, MILEAGE_SELECTOR)
         mileages = [int(mileage.text.strip(' mi.').replace(',', '')) if mileage.text.strip(' mi.').replace(',', '').isdigit() else 'N/A' for mileage in mileage_elements]
+        if not price_elements:
+            no_listings = True
+            print(f"No listings found at {url}")
+    except TimeoutException:
+        # Neither prices nor the no-results message showed up in time, retry on a later run
+        print(f"Timed out waiting for results at {url}")
+        prices, mileages = [], []
     except Exception as e:
         print(f"Failed to scrape {url}: {str(e)}")
         prices, mileages = [], []
@@ -82,30 +372,37 @@ def scrape_data(driver, make, model, year):
         'median_price': np.median(numeric_prices) if numeric_prices else 'No Data',
         'max_mileage': max(mileages) if mileages else 'No Data',
         'min_mileage': min(mileages) if mileages else 'No Data',
-        'median_mileage': np.median(mileages) if mileages else 'No Data'
+        'median_mileage': np.median(mileages) if mileages else 'No Data',
+        'no_listings': no_listings
     }
 
+INSERT_AGGREGATE_SQL = """
+    INSERT INTO car_aggregates (make, model, year, max_price, min_price, median_price, max_mileage, min_mileage, median_mileage, last_updated)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (make, model, year) DO UPDATE
+    SET max_price = EXCLUDED.max_price, min_price = EXCLUDED.min_price, median_price = EXCLUDED.median_price, max_mileage = EXCLUDED.max_mileage, min_mileage = EXCLUDED.min_mileage, median_mileage = EXCLUDED.median_mileage, last_updated = CURRENT_TIMESTAMP
+"""
+
+INSERT_PRICE_SQL = """
+    INSERT INTO car_prices (make, model, year, price, mileage, last_updated)
+    VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (make, model, year, price, mileage) DO UPDATE
+    SET last_updated = CURRENT_TIMESTAMP
+"""
+
 def insert_car_data(connection, data):
-    cursor = connection.cursor()
     # Only proceed if there is valid data to insert
     if data['max_price'] != 'No Data' and data['min_price'] != 'No Data' and data['median_price'] != 'No Data':
         # Insert aggregate data
-        cursor.execute("""
-            INSERT INTO car_aggregates (make, model, year, max_price, min_price, median_price, max_mileage, min_mileage, median_mileage, last_updated)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-            ON CONFLICT (make, model, year) DO UPDATE
-            SET max_price = EXCLUDED.max_price, min_price = EXCLUDED.min_price, median_price = EXCLUDED.median_price, max_mileage = EXCLUDED.max_mileage, min_mileage = EXCLUDED.min_mileage, median_mileage = EXCLUDED.median_mileage, last_updated = CURRENT_TIMESTAMP
-        """, (data['make'], data['model'], data['year'], data['max_price'], data['min_price'], data['median_price'], data['max_mileage'], data['min_mileage'], data['median_mileage']))
+        database.execute_prepared(connection, 'insert_car_aggregate', INSERT_AGGREGATE_SQL, (
+            data['make'], data['model'], data['year'], data['max_price'], data['min_price'], data['median_price'],
+            data['max_mileage'], data['min_mileage'], data['median_mileage']))
 
         # Insert individual price and mileage data
         for price, mileage in zip(data['prices'], data['mileages']):
             if isinstance(price, int) and isinstance(mileage, int):
-                cursor.execute("""
-                    INSERT INTO car_prices (make, model, year, price, mileage, last_updated)
-                    VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                    ON CONFLICT (make, model, year, price, mileage) DO UPDATE
-                    SET last_updated = CURRENT_TIMESTAMP
-                """, (data['make'], data['model'], data['year'], price, mileage))
+                database.execute_prepared(connection, 'insert_car_price', INSERT_PRICE_SQL,
+                                          (data['make'], data['model'], data['year'], price, mileage))
 
         connection.commit()
     else:
@@ -113,17 +410,25 @@ def insert_car_data(connection, data):
 
 
 def main():
-    config = load_postgres_configurations()
-    connection = connect_to_database(config)
+    parser = argparse.ArgumentParser(description="Scrape market prices for upcoming auction lots.")
+    parser.add_argument('--budget', type=parse_budget,
+                        help="Time budget for the run, e.g. 30m, 2h or 900s (default: no limit)")
+    args = parser.parse_args()
+
+    connection = connect_to_database()
     if connection:
-        cars = fetch_auction_data(connection)
-        driver = setup_selenium()
-        for make, model, year in cars:
-            data = scrape_data(driver, make, model, year)
-            print(data)
-            insert_car_data(connection, data)
-        driver.quit()
-        connection.close()
+        try:
+            cars = fetch_auction_data(connection)
+        finally:
+            # Don't hold a pooled connection through the scrape, inserts check out their own
+            connection.close()
+        lean = os.environ.get('SCRAPER_PROFILE', 'lean') != 'default'
+        with DriverManager(lean=lean) as drivers:
+            run_schedule(drivers, cars, args.budget)
+        # Run once with SCRAPER_PROFILE=default to get the baseline numbers to compare against
+        print("Browser stats:", drivers.stats())
+        print("Pool stats:", database.pool_stats())
+        database.dispose_engines()
     else:
         print("Failed to establish database connection.")
 
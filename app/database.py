@@ -0,0 +1,128 @@
+import os
+import re
+import configparser
+import threading
+from sqlalchemy import create_engine
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(script_dir, '../application.properties')
+
+POOL_SIZE = 5
+MAX_OVERFLOW = 5
+# Recycle connections before typical server/firewall idle timeouts kick in
+POOL_RECYCLE_SECONDS = 1800
+
+_configs = {}
+_engines = {}
+_lock = threading.Lock()
+
+
+def load_configurations(section, config_path=CONFIG_PATH):
+    """Return host/port/user/passwd/db for a section of a properties file, each file read once per process."""
+    config_path = os.path.abspath(config_path)
+    config = _configs.get(config_path)
+    if config is None:
+        config = configparser.ConfigParser()
+        if not config.read(config_path):
+            raise FileNotFoundError(f"Configuration file not found: {config_path}")
+        _configs[config_path] = config
+
+    return {
+        'host': config.get(section, 'host'),
+        'port': config.get(section, 'port'),
+        'user': config.get(section, 'user'),
+        'passwd': config.get(section, 'passwd'),
+        'db': config.get(section, 'db')
+    }
+
+def load_postgres_configurations():
+    return load_configurations('postgres')
+
+def load_mssql_configurations():
+    return load_configurations('mssql')
+
+def postgres_connection_string(config):
+    return f"postgresql://{config['user']}:{config['passwd']}@{config['host']}:{config['port']}/{config['db']}"
+
+def mssql_connection_string(config):
+    return f"mssql+pymssql://{config['user']}:{config['passwd']}@{config['host']}:{config['port']}/{config['db']}"
+
+def _get_engine(name, build_connection_string, load_config):
+    engine = _engines.get(name)
+    if engine is None:
+        with _lock:
+            engine = _engines.get(name)
+            if engine is None:
+                engine = create_engine(
+                    build_connection_string(load_config()),
+                    pool_size=POOL_SIZE,
+                    max_overflow=MAX_OVERFLOW,
+                    pool_recycle=POOL_RECYCLE_SECONDS,
+                    pool_pre_ping=True  # health check on checkout, replaces dead connections transparently
+                )
+                _engines[name] = engine
+    return engine
+
+def get_postgres_engine():
+    """Pooled engine for auto_db, created on first use and shared by every stage."""
+    return _get_engine('postgres', postgres_connection_string, load_postgres_configurations)
+
+def get_mssql_engine():
+    """Pooled engine for the vPIC database hosting spVinDecode."""
+    return _get_engine('mssql', mssql_connection_string, load_mssql_configurations)
+
+def get_postgres_connection():
+    """
+    Check out a psycopg2 connection from the pool. It behaves like a plain
+    psycopg2 connection; close() hands it back to the pool instead of closing it.
+    """
+    return get_postgres_engine().raw_connection()
+
+def _to_numbered_placeholders(sql):
+    counter = iter(range(1, sql.count('%s') + 1))
+    return re.sub(r'%s', lambda _: f"${next(counter)}", sql)
+
+def execute_prepared(connection, name, sql, params):
+    """
+    Execute `sql` (with %s placeholders) as a server-side prepared statement on a
+    pooled Postgres connection. The statement is PREPAREd once per physical
+    connection and EXECUTEd afterwards, so repeated inserts skip parse/plan.
+    Connections without pool bookkeeping fall back to a regular execute.
+    """
+    info = getattr(connection, 'info', None)
+    cursor = connection.cursor()
+    try:
+        if info is None:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+        prepared = info.setdefault('prepared_statements', set())
+        if name not in prepared:
+            cursor.execute(f"PREPARE {name} AS {_to_numbered_placeholders(sql)}")
+            prepared.add(name)
+        placeholders = ', '.join(['%s'] * len(params))
+        cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+def pool_stats():
+    """Current checked-in/checked-out/overflow counts for every engine created in this process."""
+    stats = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        stats[name] = {
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'status': pool.status()
+        }
+    return stats
+
+def dispose_engines():
+    """Close every pooled connection; call once at the end of a script."""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
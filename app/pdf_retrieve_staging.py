@@ -5,9 +5,7 @@ import logging
 import pandas as pd
 import re
 from urllib.error import HTTPError
-from sqlalchemy import create_engine
 from datetime import datetime
-import configparser
 import os
 import pdfplumber
 import numpy as np
@@ -17,16 +15,12 @@ local_pdfs = [
               "/Users/harris/Downloads/auction-050324-brooklyn.pdf"
               ]
 
-config = configparser.ConfigParser()
-script_dir = os.path.dirname(os.path.abspath(__file__))
-config_path = os.path.join(script_dir, '../application.properties')
-config.read(config_path)
+try:
+    import database
+except ImportError:
+    from app import database
 
-host = config.get('postgres', 'host')
-port = config.get('postgres', 'port')
-user = config.get('postgres', 'user')
-passwd = config.get('postgres', 'passwd')
-auto_db = config.get('postgres', 'db')
+script_dir = os.path.dirname(os.path.abspath(__file__))
 
 # Get the current date in the desired format
 current_date = datetime.now().strftime('%Y-%m-%d')
@@ -58,7 +52,6 @@ DIGIT_PATTERN = r"(\b\d{1,2}\b)"
 YEAR_PATTERN = r"\b(19[6-9]\d|20[0-1]\d|202[0-9])\b"
 PLATE_PATTERN = r"(\b[a-zA-Z0-9]{6,8}\b)"
 ST_PATTERN = r"(\b[A-Z]{2}\b)"
-DB_CONNECTION_STRING = f'postgresql://{user}:{passwd}@{host}:{port}/{auto_db}'
 
 def fetch_html_content(url):
     return requests.get(url).text
@@ -70,8 +63,8 @@ def extract_urls_from_html(html_content):
 def append_start_string_to_urls(urls, start_string):
     return [start_string + url for url in urls]
 
-def fetch_loaded_urls_from_db(connection_string):
-    engine = create_engine(connection_string)
+def fetch_loaded_urls_from_db(engine=None):
+    engine = engine or database.get_postgres_engine()
     with engine.connect() as connection:
         with connection.connection.cursor() as cursor:
             cursor.execute('SELECT url FROM url_list')
@@ -85,7 +78,7 @@ def get_auction_url_list():
     html_content = fetch_html_content(URL)
     extracted_urls = extract_urls_from_html(html_content)
     preprocessed_urls = append_start_string_to_urls(extracted_urls, START_STRING)
-    loaded_urls = fetch_loaded_urls_from_db(DB_CONNECTION_STRING)
+    loaded_urls = fetch_loaded_urls_from_db()
     filtered_urls = get_filtered_urls(set(preprocessed_urls), set(loaded_urls))
 
     logging.info("Returning URL List...")
@@ -249,7 +242,7 @@ def load_auction_db(df_list):
         logging.info("No new auctions")
         return
 
-    engine = create_engine('postgresql://' + user + ':' + passwd + '@' + host + ':'+port+'/' + auto_db)
+    engine = database.get_postgres_engine()
 
     try:
         df_list[0].to_sql('auction_list_staging', schema='public', con=engine, if_exists='append',index=False)
@@ -267,7 +260,7 @@ def load_auction_db(df_list):
     except Exception as ex:
         print(ex)
 
-    engine.dispose()
+    logging.info(f"Pool stats: {database.pool_stats()}")
 
 if __name__ == '__main__':
     if False:
@@ -280,3 +273,4 @@ if __name__ == '__main__':
         df_list = create_auction_df(url_list)
         load_auction_db(df_list)
         logging.info("Script completed.")
+    database.dispose_engines()
@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# car_aggregates.last_updated is the inserting transaction's start time, so a row can commit
+# after a refresh with a timestamp below the watermark. Re-read this far back on every refresh.
+REFRESH_OVERLAP = timedelta(minutes=15)
+
+AGGREGATE_COLUMNS = ['max_price', 'min_price', 'median_price', 'max_mileage', 'min_mileage', 'median_mileage']
+
+AGGREGATES_QUERY = """
+SELECT make, model, year, max_price, min_price, median_price, max_mileage, min_mileage, median_mileage, last_updated
+FROM car_aggregates
+"""
+
+LOTS_QUERY = """
+SELECT
+    als.vin,
+    als.lot_number,
+    als.auction_date,
+    als.borough,
+    als.location_order,
+    ald."Make" AS make,
+    ald."Model" AS model,
+    ald."Model Year" AS year
+FROM
+    auction_list_staging als
+JOIN
+    auction_list_decoded ald ON ald.vin = als.vin
+WHERE
+    als.auction_date >= current_date
+"""
+
+LOT_COUNT_QUERY = """
+SELECT COUNT(*), MAX(als.auction_date)
+FROM auction_list_staging als
+JOIN auction_list_decoded ald ON ald.vin = als.vin
+WHERE als.auction_date >= current_date
+"""
+
+
+def car_index_key(make, model, year):
+    """Normalize (make, model, year) so decoded lots and car_aggregates rows line up."""
+    return (str(make).strip().upper(), str(model).strip().upper(), str(year).strip())
+
+def auction_key(auction_date, borough, location_order):
+    if isinstance(auction_date, datetime):
+        auction_date = auction_date.date()
+    return (str(auction_date), borough, int(location_order) if location_order is not None else None)
+
+def _to_number(value):
+    return float(value) if isinstance(value, Decimal) else value
+
+
+class PriceIndex:
+    """
+    Read-only, in-memory view of car_aggregates and upcoming auction lots.
+
+    Lookups are plain dict accesses; call refresh() to pick up aggregates whose
+    last_updated moved since the previous load and any newly staged lots. With
+    load_lots=False only the aggregates are loaded, which is all estimate() needs.
+    """
+
+    def __init__(self, connection, load_lots=True):
+        self.connection = connection
+        self.load_lots = load_lots
+        self.estimates = {}
+        self.lots = {}
+        self.auctions = {}
+        self.last_updated = None
+        self.lot_signature = None
+
+    @classmethod
+    def from_connection(cls, connection, load_lots=True):
+        index = cls(connection, load_lots)
+        index.refresh()
+        return index
+
+    def _fetch(self, query, params=None):
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params)
+            columns = [x[0] for x in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def _load_aggregates(self):
+        if self.last_updated is None:
+            rows = self._fetch(AGGREGATES_QUERY)
+        else:
+            # Rows seen before are simply overwritten, the overlap only costs a few re-reads
+            rows = self._fetch(AGGREGATES_QUERY + " WHERE last_updated >= %s", (self.last_updated - REFRESH_OVERLAP,))
+
+        for row in rows:
+            key = car_index_key(row['make'], row['model'], row['year'])
+            self.estimates[key] = {column: _to_number(row[column]) for column in AGGREGATE_COLUMNS}
+            self.estimates[key]['last_updated'] = row['last_updated']
+            if row['last_updated'] is not None and (self.last_updated is None or row['last_updated'] > self.last_updated):
+                self.last_updated = row['last_updated']
+        return len(rows)
+
+    def _load_lots(self):
+        # Lots carry no timestamp, so only reload them when the set of upcoming lots changed
+        signature = tuple(self._fetch(LOT_COUNT_QUERY)[0].values())
+        if signature == self.lot_signature:
+            return 0
+
+        lots = {}
+        auctions = {}
+        for row in self._fetch(LOTS_QUERY):
+            lot = {
+                'vin': row['vin'],
+                'lot_number': row['lot_number'],
+                'car': car_index_key(row['make'], row['model'], row['year'])
+            }
+            lots[row['vin']] = lot
+            auctions.setdefault(auction_key(row['auction_date'], row['borough'], row['location_order']), []).append(lot)
+
+        self.lots = lots
+        self.auctions = auctions
+        self.lot_signature = signature
+        return len(lots)
+
+    def refresh_aggregates(self):
+        """Load aggregates changed since the last refresh; returns the number of rows read."""
+        return self._load_aggregates()
+
+    def refresh(self):
+        """Load aggregates changed since the last refresh and, if enabled, reload lots if they changed."""
+        updated_aggregates = self._load_aggregates()
+        reloaded_lots = self._load_lots() if self.load_lots else 0
+        return updated_aggregates, reloaded_lots
+
+    def estimate(self, make, model, year):
+        return self.estimates.get(car_index_key(make, model, year))
+
+    def estimate_vin(self, vin):
+        lot = self.lots.get(vin)
+        if lot is None:
+            return None
+        return self.estimates.get(lot['car'])
+
+    def estimate_auction(self, auction_date, borough, location_order):
+        """Return [(lot_number, vin, estimate or None), ...] for one auction location."""
+        return [(lot['lot_number'], lot['vin'], self.estimates.get(lot['car']))
+                for lot in self.auctions.get(auction_key(auction_date, borough, location_order), [])]
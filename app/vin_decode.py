@@ -1,20 +1,30 @@
 import os
 import logging
-import configparser
 import pandas as pd
 from datetime import datetime, date
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import MetaData
 import json
-import psycopg2
 from collections import defaultdict
 
+try:
+    import database
+    from price_index import PriceIndex
+except ImportError:
+    from app import database
+    from app.price_index import PriceIndex
+
 metadata = MetaData()
 
 # Get the current date in the desired format
 current_date = datetime.now().strftime('%Y-%m-%d')
 
-# Set the log directory (assuming you've already defined it)
-log_dir = '../logs'  # example log directory
+# Set the log directory
+script_dir = os.path.dirname(os.path.abspath(__file__))
+log_dir = os.path.join(script_dir, '../logs')
+
+# Create the logs directory if it doesn't exist
+if not os.path.exists(log_dir):
+    os.makedirs(log_dir)
 
 # Create the filename using the current date
 log_filename = os.path.join(log_dir, f'decode_vin_{current_date}.log')
@@ -33,39 +43,6 @@ def date_handler(obj):
         return obj.isoformat()
     raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
-def load_postgres_configurations():
-    config = configparser.ConfigParser()
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    config_path = os.path.join(script_dir, '../application.properties')
-    config.read(config_path)
-
-    db_config = {
-        'host': config.get('postgres', 'host'),
-        'port': config.get('postgres', 'port'),
-        'user': config.get('postgres', 'user'),
-        'passwd': config.get('postgres', 'passwd'),
-        'db': config.get('postgres', 'db')
-    }
-
-    return db_config
-
-def load_mssql_configurations():
-    config = configparser.ConfigParser()
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    config_path = os.path.join(script_dir, '../application.properties')
-    config.read(config_path)
-
-    db_config = {
-        'host': config.get('mssql', 'host'),
-        'port': config.get('mssql', 'port'),
-        'user': config.get('mssql', 'user'),
-        'passwd': config.get('mssql', 'passwd'),
-        'db': config.get('mssql', 'db')
-    }
-
-    return db_config
-
-
 def fetch_vins_from_staging(engine):
     sql = """
     SELECT DISTINCT a.vin 
@@ -129,15 +106,9 @@ def handle_and_log_missing_columns(df, table_name, engine):
     return df  # Return the modified DataFrame
 
 def decode_vin():
-    postgres_config = load_postgres_configurations()
-    mssql_config = load_mssql_configurations()
-
     # Connect to the auto_db and fetch vins
-    auto_db_connection_str = f"postgresql://{postgres_config['user']}:{postgres_config['passwd']}@{postgres_config['host']}:{postgres_config['port']}/{postgres_config['db']}"
-    vin_decode_db_connection_str = f"mssql+pymssql://{mssql_config['user']}:{mssql_config['passwd']}@{mssql_config['host']}:{mssql_config['port']}/{mssql_config['db']}"
-
-    engine_auto_db = create_engine(auto_db_connection_str)
-    engine_vin_decode_db = create_engine(vin_decode_db_connection_str)
+    engine_auto_db = database.get_postgres_engine()
+    engine_vin_decode_db = database.get_mssql_engine()
 
     with engine_auto_db.connect() as connection_auto_db, engine_vin_decode_db.connect() as connection_vin_decode_db:
         staging_list = fetch_vins_from_staging(connection_auto_db)
@@ -157,8 +128,6 @@ def decode_vin():
             logging.error(f"An error occurred: {e}")
 
 def create_json():
-    postgres_config = load_postgres_configurations()
-
     sql_query = """
     SELECT
         als.lot_number,
@@ -191,21 +160,34 @@ def create_json():
         auction_date, borough, location_order, lot_number;
     """
 
+    conn = None
+    cursor = None
     try:
-        conn = psycopg2.connect(
-            host=postgres_config['host'],
-            database=postgres_config['db'],
-            user=postgres_config['user'],
-            password=postgres_config['passwd'])
+        conn = database.get_postgres_connection()
         cursor = conn.cursor()
         cursor.execute(sql_query)
 
         columns = [x[0] for x in cursor.description]
         rows = cursor.fetchall()
 
+        # Estimates are optional: car_aggregates may not exist yet on a fresh database
+        try:
+            # Only the aggregates are needed, the lots are the rows fetched above
+            price_index = PriceIndex.from_connection(conn, load_lots=False)
+        except Exception as e:
+            logging.warning(f"Price estimates unavailable, exporting without them: {e}")
+            conn.rollback()
+            price_index = None
+
         grouped_data = defaultdict(list)
         for result in rows:
             record = dict(zip(columns, result))
+            estimate = {}
+            if price_index is not None:
+                estimate = price_index.estimate(record['make'], record['model'], record['model_year']) or {}
+            record['estimated_min_price'] = estimate.get('min_price')
+            record['estimated_median_price'] = estimate.get('median_price')
+            record['estimated_max_price'] = estimate.get('max_price')
             global_key = (record['auction_date'], record['borough'], record['location_order'])
             grouped_data[global_key].append(record)
 
@@ -228,8 +210,6 @@ def create_json():
             }
             optimized_data.append(group_data)
 
-        cursor.close()
-        conn.close()
         # Ensure /data directory exists
         data_directory = '../data'
         if not os.path.exists(data_directory):
@@ -244,8 +224,16 @@ def create_json():
 
     except Exception as e:
         return str(e), 500
+    finally:
+        # Hand the pooled connection back even when the export fails
+        if cursor is not None:
+            cursor.close()
+        if conn is not None:
+            conn.close()
     return
 
 if __name__ == '__main__':
     decode_vin()
     create_json()
+    logging.info(f"Pool stats: {database.pool_stats()}")
+    database.dispose_engines()
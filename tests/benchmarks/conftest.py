@@ -0,0 +1,50 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, event
+
+pytest.importorskip("pytest_benchmark")
+
+from tests.benchmarks.synthetic import BENCH_LOTS, build_auction_pdf, make_lots
+
+
+@pytest.fixture(scope='session')
+def lots():
+    return make_lots(BENCH_LOTS)
+
+@pytest.fixture(scope='session')
+def auction_pdf(tmp_path_factory, lots):
+    path = tmp_path_factory.mktemp('pdf') / 'auction-050324-brooklyn.pdf'
+    path.write_bytes(build_auction_pdf(lots))
+    return str(path)
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """The pipeline writes to cwd-relative ../pdf and ../data, keep that inside tmp_path."""
+    cwd = tmp_path / 'app'
+    cwd.mkdir()
+    monkeypatch.chdir(cwd)
+    return tmp_path
+
+@pytest.fixture
+def auto_db(tmp_path, lots):
+    """
+    SQLite stand-in for auto_db. The same file is attached again as `public`
+    so schema-qualified writes and unqualified reads see the same tables.
+    """
+    db_path = str(tmp_path / 'auto_db.sqlite')
+    engine = create_engine(f"sqlite:///{db_path}")
+
+    @event.listens_for(engine, 'connect')
+    def attach_public(dbapi_connection, connection_record):
+        dbapi_connection.execute(f"ATTACH DATABASE '{db_path}' AS public")
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('CREATE TABLE auction_list_staging (lot_number TEXT, vin TEXT, auction_date TEXT)')
+        conn.execute('CREATE TABLE auction_list_decoded (vin TEXT, "Make" TEXT, "Model" TEXT, "Model Year" TEXT, '
+                     '"Body Class" TEXT, "Drive Type" TEXT, "Fuel Type - Primary" TEXT, '
+                     '"Engine Number of Cylinders" TEXT, "Displacement (L)" TEXT, "Trim" TEXT, "Series" TEXT)')
+        conn.executemany('INSERT INTO auction_list_staging VALUES (?, ?, ?)',
+                         [(lot['lot_number'], lot['vin'], '2099-05-03') for lot in lots])
+    yield engine
+    engine.dispose()
@@ -0,0 +1,71 @@
+import os
+import random
+
+# Size of the synthetic auction PDFs, override with BENCH_LOTS=2000 for a heavier run
+BENCH_LOTS = int(os.environ.get('BENCH_LOTS', '200'))
+BENCH_SEED = 20240503
+
+VIN_CHARS = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+MAKES = [('HONDA', 'Accord'), ('TOYOTA', 'Camry'), ('FORD', 'F-150'), ('NISSAN', 'Altima'),
+         ('CHEVROLET', 'Malibu'), ('BMW', '328i'), ('JEEP', 'Grand Cherokee'), ('HYUNDAI', 'Sonata')]
+LIENHOLDERS = ['TD BANK', 'ALLY FINANCIAL', 'SANTANDER CONSUMER', 'CAPITAL ONE AUTO', '', '']
+LINES_PER_PAGE = 45
+
+
+def make_lots(count, seed=BENCH_SEED):
+    rng = random.Random(seed)
+    lots = []
+    for i in range(count):
+        make, model = rng.choice(MAKES)
+        lots.append({
+            'lot_number': str(i % 99 + 1),
+            'year': str(rng.randint(2000, 2023)),
+            'make': make,
+            'model': model,
+            'plate': ''.join(rng.choice(VIN_CHARS) for _ in range(7)),
+            'state': rng.choice(['NY', 'NJ', 'CT', 'PA']),
+            'vin': ''.join(rng.choice(VIN_CHARS) for _ in range(17)),
+            'lienholder': rng.choice(LIENHOLDERS),
+        })
+    return lots
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def build_auction_pdf(lots):
+    """Render lots as a plain-text NYC-style auction list PDF (no external PDF library needed)."""
+    lines = ['#  YEAR  MAKE  PLATE#  ST  VEHICLE ID  LIENHOLDER']
+    for lot in lots:
+        lines.append(f"{lot['lot_number']} {lot['year']} {lot['make']} {lot['plate']} {lot['state']} {lot['vin']} {lot['lienholder']}".rstrip())
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)]
+
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page_lines in pages:
+        content = "BT /F1 9 Tf 11 TL 36 800 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in page_lines) + " ET"
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1')
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1')
+    out += b"".join(f"{offset:010d} 00000 n \n".encode('latin-1') for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+    return out
+
+
+def vin_decode_handler(sql, params):
+    """Imitates spVinDecode: one (Variable, Value) row per decoded attribute."""
+    vin = params[0]
+    make, model = MAKES[sum(map(ord, vin)) % len(MAKES)]
+    values = {'Make': make, 'Model': model, 'Model Year': str(2000 + sum(map(ord, vin)) % 24),
+              'Body Class': 'Sedan/Saloon', 'Drive Type': 'FWD', 'Fuel Type - Primary': 'Gasoline',
+              'Engine Number of Cylinders': '4', 'Displacement (L)': '2.4', 'Trim': None, 'Series': None}
+    return ['Variable', 'Value', 'VariableId'], [(k, v, i) for i, (k, v) in enumerate(values.items())]
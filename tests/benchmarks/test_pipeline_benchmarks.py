@@ -0,0 +1,160 @@
+import json
+import random
+from datetime import date
+
+import pytest
+from bs4 import BeautifulSoup
+
+from app import pdf_retrieve_staging
+from app import vin_decode
+from tests.stubs import StubConnection, StubEngine
+from tests.benchmarks.synthetic import MAKES, BENCH_SEED, LINES_PER_PAGE, vin_decode_handler
+
+# Deselected by the default `-m "not benchmark"` in pytest.ini, run with `-m benchmark`
+pytestmark = [
+    pytest.mark.benchmark,
+    pytest.mark.filterwarnings("ignore:pandas only supports SQLAlchemy:UserWarning"),
+]
+
+# Millisecond-scale stages are averaged over several calls per round to keep the regression gate stable
+FAST_ROUNDS = 20
+FAST_ITERATIONS = 20
+# Listings per saved results page; large enough that scrape_data/insert_car_data calls aren't dominated by timer noise
+RESULT_LISTINGS = 500
+
+AUCTION_URL = "https://www.nyc.gov/assets/finance/downloads/pdf/auction-050324-brooklyn.pdf"
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+        self.headers = {'content-type': 'application/pdf'}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeElement:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeDriver:
+    """Serves a saved results page to scrape_data in place of Chrome."""
+
+    def __init__(self, html):
+        self.soup = BeautifulSoup(html, 'html.parser')
+
+    def get(self, url):
+        self.current_url = url
+
+    def find_elements(self, by, selector):
+        return [FakeElement(element.get_text()) for element in self.soup.select(selector)]
+
+
+def results_page(listings=RESULT_LISTINGS, seed=BENCH_SEED):
+    rng = random.Random(seed)
+    items = []
+    for _ in range(listings):
+        items.append(
+            '<li class="result-list-item">'
+            f'<div class="badge__label label--price">${rng.randint(3000, 45000):,}</div>'
+            f'<div class="info mileageDate"><span class="mileage">{rng.randint(5000, 180000):,} mi.</span></div>'
+            '</li>'
+        )
+    return f"<html><body><ul>{''.join(items)}</ul></body></html>"
+
+
+@pytest.fixture
+def offline_pdf_source(monkeypatch, auction_pdf, workdir):
+    """Route the PDF download and tabula read to the synthetic PDF."""
+    with open(auction_pdf, 'rb') as f:
+        content = f.read()
+    read_pdf = pdf_retrieve_staging.tabula.read_pdf
+    monkeypatch.setattr(pdf_retrieve_staging.requests, 'get', lambda url, **kwargs: FakeResponse(content))
+    monkeypatch.setattr(pdf_retrieve_staging.tabula, 'read_pdf', lambda pdf, **kwargs: read_pdf(auction_pdf, **kwargs))
+    return auction_pdf
+
+
+def extracted_enough(extracted, lots):
+    # extract_text_from_pdf joins pages without a newline, so the last lot of a page can be lost
+    pages = len(lots) // LINES_PER_PAGE + 1
+    return len(lots) - pages <= extracted <= len(lots)
+
+def test_manual_extraction(benchmark, auction_pdf, lots):
+    df = benchmark(pdf_retrieve_staging.manual_extraction, auction_pdf)
+    assert extracted_enough(len(df), lots)
+
+def test_process_pdf(benchmark, offline_pdf_source, lots):
+    df = benchmark(pdf_retrieve_staging.process_pdf, AUCTION_URL)
+    assert extracted_enough(len(df), lots)
+
+def test_create_auction_df(benchmark, offline_pdf_source, lots):
+    urls = [AUCTION_URL.replace('brooklyn', borough) for borough in ['brooklyn', 'queens', 'bronx']]
+    df_list = benchmark(pdf_retrieve_staging.create_auction_df, urls)
+    assert extracted_enough(len(df_list[0]) / 3, lots)
+    assert (df_list[1]['status'] == 'loaded_url').all()
+
+def test_decode_vin(benchmark, monkeypatch, auto_db, lots):
+    monkeypatch.setattr(vin_decode.database, 'get_postgres_engine', lambda: auto_db)
+    monkeypatch.setattr(vin_decode.database, 'get_mssql_engine',
+                        lambda: StubEngine(StubConnection(vin_decode_handler)))
+
+    def reset_decoded():
+        with auto_db.begin() as connection:
+            connection.exec_driver_sql('DELETE FROM auction_list_decoded')
+
+    benchmark.pedantic(vin_decode.decode_vin, setup=reset_decoded, rounds=5, iterations=1)
+    with auto_db.connect() as connection:
+        decoded = connection.exec_driver_sql('SELECT COUNT(*) FROM auction_list_decoded').scalar()
+    assert decoded == len({lot['vin'] for lot in lots})
+
+def test_create_json(benchmark, monkeypatch, workdir, lots):
+    columns = ['lot_number', 'auction_date', 'state', 'lienholder_name', 'borough', 'location_order', 'vin',
+               'model_year', 'make', 'model', 'trim_level', 'series', 'body_class', 'drive_type', 'cylinders',
+               'displacement', 'fuel_type', 'engine_configuration', 'base_price', 'transmission']
+    auction_date = date(2099, 5, 3)
+    rows = [(lot['lot_number'], auction_date, lot['state'], lot['lienholder'] or None, 'brooklyn', i % 3 + 1,
+             lot['vin'], lot['year'], lot['make'], lot['model'], None, None, 'Sedan/Saloon', 'FWD', '4', '2.4',
+             'Gasoline', None, None, None) for i, lot in enumerate(lots)]
+    aggregates = [(make, model, str(year), 30000, 4000, 15000, 150000, 8000, 70000, date(2024, 1, 1))
+                  for make, model in MAKES for year in range(2000, 2024)]
+
+    queries = []
+
+    def handler(sql, params):
+        queries.append(sql)
+        if 'engine_configuration' in sql:
+            return columns, rows
+        if 'FROM car_aggregates' in sql:
+            return ['make', 'model', 'year', 'max_price', 'min_price', 'median_price', 'max_mileage',
+                    'min_mileage', 'median_mileage', 'last_updated'], aggregates
+        if 'COUNT(*)' in sql:
+            return ['count', 'max'], [(len(rows), auction_date)]
+        return (['vin', 'lot_number', 'auction_date', 'borough', 'location_order', 'make', 'model', 'year'],
+                [(r[6], r[0], r[1], r[4], r[5], r[8], r[9], r[7]) for r in rows])
+
+    monkeypatch.setattr(vin_decode.database, 'get_postgres_connection', lambda: StubConnection(handler))
+    result = benchmark.pedantic(vin_decode.create_json, rounds=FAST_ROUNDS, iterations=FAST_ITERATIONS)
+    assert result is None
+    with open(workdir / 'data' / 'output.json') as f:
+        groups = json.load(f)
+    estimates = [price for group in groups for price in group['records']['estimated_median_price']]
+    assert len(estimates) == len(lots)
+    assert set(estimates) == {15000}
+    assert not any('ald."Make" AS make' in sql for sql in queries)
+
+def test_scrape_data(benchmark):
+    car_prices = pytest.importorskip('app.car_prices')
+    driver = FakeDriver(results_page())
+    data = benchmark.pedantic(car_prices.scrape_data, args=(driver, 'Honda', 'Accord', 2015),
+                              rounds=FAST_ROUNDS, iterations=5)
+    assert data['median_price'] != 'No Data'
+
+def test_insert_car_data(benchmark):
+    car_prices = pytest.importorskip('app.car_prices')
+    data = car_prices.scrape_data(FakeDriver(results_page()), 'Honda', 'Accord', 2015)
+    connection = StubConnection(lambda sql, params: ([], []))
+    benchmark.pedantic(car_prices.insert_car_data, args=(connection, data),
+                       rounds=FAST_ROUNDS, iterations=FAST_ITERATIONS)
+    assert connection.info['prepared_statements'] == {'insert_car_aggregate', 'insert_car_price'}
@@ -0,0 +1,66 @@
+from contextlib import contextmanager
+
+
+class StubCursor:
+    """DB-API cursor answering from a handler(sql, params) -> (columns, rows) callback."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.description = None
+        self.rows = []
+        self.rowcount = -1
+
+    def execute(self, sql, params=None):
+        columns, rows = self.handler(sql, params)
+        self.description = [(column, None, None, None, None, None, None) for column in columns] if columns else None
+        self.rows = list(rows)
+        self.rowcount = len(self.rows)
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size=None):
+        size = size or len(self.rows)
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class StubConnection:
+    """DB-API connection stand-in; `info` mirrors a pooled SQLAlchemy connection."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.info = {}
+        self.executed = 0
+
+    def cursor(self):
+        self.executed += 1
+        return StubCursor(self.handler)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class StubEngine:
+    def __init__(self, connection):
+        self.connection = connection
+
+    @contextmanager
+    def connect(self):
+        yield self.connection
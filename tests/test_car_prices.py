@@ -0,0 +1,248 @@
+import argparse
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("selenium")
+from app.car_prices import *
+from selenium.common.exceptions import NoSuchElementException
+
+NOW = datetime(2099, 5, 1, 2, 0)
+
+
+def empty_state():
+    return {'pending': [], 'no_data': {}}
+
+# parse_budget(budget)
+def test_parse_budget_units():
+    assert parse_budget('90s') == 90
+    assert parse_budget('30m') == 1800
+    assert parse_budget('2h') == 7200
+    assert parse_budget('45') == 2700
+    assert parse_budget(None) is None
+
+def test_parse_budget_invalid():
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_budget('soon')
+
+# build_work_queue(cars, state, now)
+def test_queue_orders_by_date_then_lot_count():
+    cars = [('FORD', 'F-150', '2012', '2099-05-10', 9),
+            ('HONDA', 'Accord', '2015', '2099-05-03', 2),
+            ('TOYOTA', 'Camry', '2014', '2099-05-03', 7)]
+    queue = build_work_queue(cars, empty_state(), now=NOW)
+    assert [entry[0] for entry in queue] == ['TOYOTA', 'HONDA', 'FORD']
+
+def test_queue_fresh_rows_replace_carried_over():
+    state = {'pending': [['HONDA', 'Accord', '2015', '2099-05-20', 1],
+                         ['BMW', '328i', '2011', '2099-05-04', 3]],
+             'no_data': {}}
+    queue = build_work_queue([('HONDA', 'Accord', '2015', '2099-05-03', 5)], state, now=NOW)
+    assert queue == [['HONDA', 'Accord', '2015', '2099-05-03', 5],
+                     ['BMW', '328i', '2011', '2099-05-04', 3]]
+
+def test_queue_drops_past_auctions():
+    state = {'pending': [['BMW', '328i', '2011', '2099-04-30', 3]], 'no_data': {}}
+    queue = build_work_queue([('HONDA', 'Accord', '2015', '2099-05-01', 5)], state, now=NOW)
+    assert [entry[0] for entry in queue] == ['HONDA']
+
+def test_queue_no_data_ttl():
+    cars = [('HONDA', 'Accord', '2015', '2099-06-01', 5)]
+    recent = {'pending': [], 'no_data': {car_key('HONDA', 'Accord', '2015'): (NOW - timedelta(days=1)).isoformat()}}
+    expired = {'pending': [], 'no_data': {car_key('HONDA', 'Accord', '2015'): (NOW - NO_DATA_RETRY_TTL).isoformat()}}
+    assert build_work_queue(cars, recent, now=NOW) == []
+    assert len(build_work_queue(cars, expired, now=NOW)) == 1
+
+def test_queue_no_data_never_held_past_auction():
+    # Still inside the TTL, but the auction is tomorrow
+    cars = [('HONDA', 'Accord', '2015', '2099-05-02', 5)]
+    state = {'pending': [], 'no_data': {car_key('HONDA', 'Accord', '2015'): (NOW - timedelta(days=1)).isoformat()}}
+    assert len(build_work_queue(cars, state, now=NOW)) == 1
+
+# run_schedule(...)
+class StubDrivers:
+    def after_page(self):
+        pass
+
+def scraped(make, model, year, median_price='No Data', no_listings=False):
+    return {'make': make, 'model': model, 'year': year, 'median_price': median_price, 'no_listings': no_listings}
+
+def test_run_schedule_saves_state_when_scrape_fails(tmp_path, monkeypatch):
+    calls = []
+
+    def flaky_scrape(drivers, make, model, year):
+        calls.append(make)
+        if len(calls) == 2:
+            raise RuntimeError("chrome crashed")
+        return scraped(make, model, year, no_listings=True)
+
+    monkeypatch.setattr('app.car_prices.scrape_data', flaky_scrape)
+    monkeypatch.setattr('app.car_prices.store_car_data', lambda data: None)
+    cars = [('HONDA', 'Accord', '2015', '2099-06-01', 5),
+            ('TOYOTA', 'Camry', '2014', '2099-06-01', 3),
+            ('FORD', 'F-150', '2012', '2099-06-02', 1)]
+    state_path = str(tmp_path / 'state.json')
+
+    with pytest.raises(RuntimeError):
+        run_schedule(StubDrivers(), cars, state_path=state_path)
+
+    with open(state_path) as f:
+        state = json.load(f)
+    assert [entry[0] for entry in state['pending']] == ['TOYOTA', 'FORD']
+    assert list(state['no_data']) == [car_key('HONDA', 'Accord', '2015')]
+
+def test_run_schedule_only_records_genuine_no_data(tmp_path, monkeypatch):
+    results = {'HONDA': scraped('HONDA', 'Accord', '2015', no_listings=True),
+               'TOYOTA': scraped('TOYOTA', 'Camry', '2014', no_listings=False)}
+    monkeypatch.setattr('app.car_prices.scrape_data', lambda drivers, make, model, year: results[make])
+    monkeypatch.setattr('app.car_prices.store_car_data', lambda data: None)
+    cars = [('HONDA', 'Accord', '2015', '2099-06-01', 5), ('TOYOTA', 'Camry', '2014', '2099-06-01', 3)]
+    state_path = str(tmp_path / 'state.json')
+
+    assert run_schedule(StubDrivers(), cars, state_path=state_path) == 2
+    with open(state_path) as f:
+        state = json.load(f)
+    assert list(state['no_data']) == [car_key('HONDA', 'Accord', '2015')]
+    assert state['pending'] == []
+
+# DriverManager
+class FakeBrowser:
+    def __init__(self):
+        self.visited = []
+        self.closed = False
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def quit(self):
+        self.closed = True
+
+@pytest.fixture
+def browsers(monkeypatch):
+    created = []
+
+    def fake_setup_selenium(lean=True):
+        created.append(FakeBrowser())
+        return created[-1]
+
+    monkeypatch.setattr('app.car_prices.setup_selenium', fake_setup_selenium)
+    monkeypatch.setattr('app.car_prices.driver_rss_mb', lambda driver: 100.0)
+    return created
+
+def test_driver_manager_recycles_after_max_pages(browsers):
+    with DriverManager(max_pages=2, max_rss_mb=1000) as drivers:
+        for page in range(5):
+            drivers.load(f"https://example.com/{page}")
+            drivers.after_page()
+    assert [len(browser.visited) for browser in browsers] == [2, 2, 1]
+    assert all(browser.closed for browser in browsers)
+    stats = drivers.stats()
+    assert stats['pages'] == 5
+    assert stats['recycles'] == 2
+
+def test_driver_manager_recycles_on_rss(browsers, monkeypatch):
+    monkeypatch.setattr('app.car_prices.driver_rss_mb', lambda driver: 2048.0)
+    drivers = DriverManager(max_pages=100, max_rss_mb=1024)
+    drivers.load("https://example.com/1")
+    drivers.after_page()
+    assert browsers[0].closed
+    assert drivers.driver is None
+    assert drivers.peak_rss_mb == 2048.0
+    drivers.load("https://example.com/2")
+    assert len(browsers) == 2
+
+# get_chromedriver_path(refresh)
+class FakeChromeDriverManager:
+    installs = []
+
+    def install(self):
+        FakeChromeDriverManager.installs.append(1)
+        return FakeChromeDriverManager.path
+
+@pytest.fixture
+def driver_cache(tmp_path, monkeypatch):
+    installed = tmp_path / 'chromedriver-new'
+    installed.write_text('')
+    FakeChromeDriverManager.installs = []
+    FakeChromeDriverManager.path = str(installed)
+    monkeypatch.setattr('app.car_prices.ChromeDriverManager', FakeChromeDriverManager)
+    cache = tmp_path / '.cache' / 'chromedriver_path'
+    monkeypatch.setattr('app.car_prices.DRIVER_PATH_CACHE', str(cache))
+    return cache
+
+def test_chromedriver_path_cache_miss_then_hit(driver_cache):
+    assert get_chromedriver_path() == FakeChromeDriverManager.path
+    assert driver_cache.read_text() == FakeChromeDriverManager.path
+    assert get_chromedriver_path() == FakeChromeDriverManager.path
+    assert len(FakeChromeDriverManager.installs) == 1
+
+def test_chromedriver_path_refresh_reinstalls(driver_cache, tmp_path):
+    stale = tmp_path / 'chromedriver-old'
+    stale.write_text('')
+    driver_cache.parent.mkdir()
+    driver_cache.write_text(str(stale))
+    assert get_chromedriver_path() == str(stale)
+    assert get_chromedriver_path(refresh=True) == FakeChromeDriverManager.path
+    assert driver_cache.read_text() == FakeChromeDriverManager.path
+    assert len(FakeChromeDriverManager.installs) == 1
+
+def test_setup_selenium_retries_on_stale_driver(driver_cache, tmp_path, monkeypatch):
+    stale = tmp_path / 'chromedriver-old'
+    stale.write_text('')
+    driver_cache.parent.mkdir()
+    driver_cache.write_text(str(stale))
+    launched = []
+
+    def fake_chrome(service, options):
+        launched.append(service.path)
+        if len(launched) == 1:
+            raise SessionNotCreatedException("This version of ChromeDriver only supports Chrome version 120")
+        return FakeBrowser()
+
+    monkeypatch.setattr('app.car_prices.webdriver.Chrome', fake_chrome)
+    driver = setup_selenium(lean=False)
+    assert isinstance(driver, FakeBrowser)
+    assert launched == [str(stale), FakeChromeDriverManager.path]
+    assert driver_cache.read_text() == FakeChromeDriverManager.path
+
+# scrape_data(driver, make, model, year)
+class Element:
+    def __init__(self, text):
+        self.text = text
+
+class ResultsPage:
+    """Fake driver returning fixed elements per CSS selector."""
+
+    def __init__(self, elements):
+        self.elements = elements
+
+    def get(self, url):
+        self.url = url
+
+    def find_elements(self, by, selector):
+        return self.elements.get(selector, [])
+
+    def find_element(self, by, selector):
+        if not self.elements.get(selector):
+            raise NoSuchElementException(selector)
+        return self.elements[selector][0]
+
+def test_scrape_data_prices():
+    page = ResultsPage({PRICE_SELECTOR: [Element('$10,000'), Element('$14,000')],
+                        MILEAGE_SELECTOR: [Element('50,000 mi.'), Element('70,000 mi.')]})
+    data = scrape_data(page, 'Honda', 'Accord', 2015)
+    assert data['median_price'] == 12000
+    assert data['no_listings'] is False
+
+def test_scrape_data_explicit_no_results():
+    page = ResultsPage({NO_RESULTS_SELECTOR: [Element('No results found')]})
+    data = scrape_data(page, 'Honda', 'Accord', 2015)
+    assert data['median_price'] == 'No Data'
+    assert data['no_listings'] is True
+
+def test_scrape_data_timeout_is_retryable(monkeypatch):
+    monkeypatch.setattr('app.car_prices.SCRAPE_WAIT_SECONDS', 0.1)
+    data = scrape_data(ResultsPage({}), 'Honda', 'Accord', 2015)
+    assert data['median_price'] == 'No Data'
+    assert data['no_listings'] is False
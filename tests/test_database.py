@@ -0,0 +1,82 @@
+import pytest
+from app import database
+from app.database import *
+from app.database import _get_engine, _to_numbered_placeholders
+from tests.stubs import StubConnection
+
+
+def write_properties(path, host):
+    path.write_text(f"[postgres]\nhost = {host}\nport = 5432\nuser = u\npasswd = p\ndb = auto_db\n")
+    return str(path)
+
+# load_configurations(section, config_path)
+def test_load_configurations_per_path(tmp_path):
+    first = write_properties(tmp_path / 'first.properties', 'first-host')
+    second = write_properties(tmp_path / 'second.properties', 'second-host')
+    assert load_configurations('postgres', first)['host'] == 'first-host'
+    assert load_configurations('postgres', second)['host'] == 'second-host'
+
+def test_load_configurations_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_configurations('postgres', str(tmp_path / 'missing.properties'))
+
+# execute_prepared(connection, name, sql, params)
+class RecordingDb:
+    def __init__(self):
+        self.statements = []
+
+    def handler(self, sql, params):
+        self.statements.append((sql, params))
+        return [], []
+
+class PlainConnection(StubConnection):
+    """A DB-API connection without pool bookkeeping (no `info`)."""
+
+    def __init__(self, handler):
+        super().__init__(handler)
+        del self.info
+
+INSERT_SQL = "INSERT INTO car_prices (make, model, price) VALUES (%s, %s, %s)"
+
+def test_numbered_placeholders():
+    assert _to_numbered_placeholders(INSERT_SQL) == "INSERT INTO car_prices (make, model, price) VALUES ($1, $2, $3)"
+    assert _to_numbered_placeholders("SELECT 1") == "SELECT 1"
+
+def test_execute_prepared_prepares_once_per_connection():
+    db = RecordingDb()
+    connection = StubConnection(db.handler)
+    execute_prepared(connection, 'insert_price', INSERT_SQL, ('HONDA', 'Accord', 10000))
+    execute_prepared(connection, 'insert_price', INSERT_SQL, ('TOYOTA', 'Camry', 12000))
+    assert db.statements == [
+        ("PREPARE insert_price AS INSERT INTO car_prices (make, model, price) VALUES ($1, $2, $3)", None),
+        ("EXECUTE insert_price (%s, %s, %s)", ('HONDA', 'Accord', 10000)),
+        ("EXECUTE insert_price (%s, %s, %s)", ('TOYOTA', 'Camry', 12000)),
+    ]
+    assert connection.info['prepared_statements'] == {'insert_price'}
+
+    # A different physical connection has its own session and must PREPARE again
+    other = StubConnection(db.handler)
+    execute_prepared(other, 'insert_price', INSERT_SQL, ('FORD', 'F-150', 9000))
+    assert db.statements[-2][0].startswith("PREPARE insert_price")
+
+def test_execute_prepared_without_info_falls_back():
+    db = RecordingDb()
+    execute_prepared(PlainConnection(db.handler), 'insert_price', INSERT_SQL, ('HONDA', 'Accord', 10000))
+    assert db.statements == [(INSERT_SQL, ('HONDA', 'Accord', 10000))]
+
+# pool_stats() / dispose_engines()
+def test_pool_stats_and_dispose(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, '_engines', {})
+    engine = _get_engine('sqlite', lambda config: f"sqlite:///{tmp_path / 'pool.sqlite'}", lambda: {})
+    assert _get_engine('sqlite', None, None) is engine
+
+    connection = engine.raw_connection()
+    stats = pool_stats()['sqlite']
+    assert stats['checked_out'] == 1
+    assert stats['size'] == POOL_SIZE
+    connection.close()
+    assert pool_stats()['sqlite']['checked_out'] == 0
+    assert pool_stats()['sqlite']['checked_in'] == 1
+
+    dispose_engines()
+    assert pool_stats() == {}
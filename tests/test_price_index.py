@@ -0,0 +1,96 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from app.price_index import *
+from tests.stubs import StubConnection
+
+T0 = datetime(2099, 5, 1, 3, 0)
+AGGREGATE_FIELDS = ['make', 'model', 'year', 'max_price', 'min_price', 'median_price',
+                    'max_mileage', 'min_mileage', 'median_mileage', 'last_updated']
+LOT_FIELDS = ['vin', 'lot_number', 'auction_date', 'borough', 'location_order', 'make', 'model', 'year']
+
+
+class FakeAutoDb:
+    """Answers PriceIndex queries from in-memory car_aggregates and lot rows, recording what was run."""
+
+    def __init__(self):
+        self.aggregates = {
+            ('Honda', 'Accord', '2015'): (Decimal('21000'), Decimal('9000'), Decimal('15000.5'), 120000, 20000, 60000, T0),
+            ('TOYOTA', 'Camry', '2014'): (18000, 7000, 12000, 150000, 30000, 80000, T0 - timedelta(days=2)),
+        }
+        self.lots = [
+            ('1HGCM82633A004352', '1', date(2099, 5, 3), 'brooklyn', 1, 'HONDA', 'Accord', '2015'),
+            ('4T1BF1FK5EU123456', '2', date(2099, 5, 3), 'brooklyn', 1, 'TOYOTA', 'Camry', '2014'),
+            ('1FTFW1ET5DFC10312', '1', date(2099, 5, 4), 'queens', 2, 'FORD', 'F-150', '2013'),
+        ]
+        self.queries = []
+
+    def handler(self, sql, params):
+        self.queries.append((sql, params))
+        if 'FROM car_aggregates' in sql:
+            since = params[0] if params else None
+            return AGGREGATE_FIELDS, [key + values for key, values in self.aggregates.items()
+                                      if since is None or values[-1] >= since]
+        if 'COUNT(*)' in sql:
+            return ['count', 'max'], [(len(self.lots), max(lot[2] for lot in self.lots))]
+        return LOT_FIELDS, self.lots
+
+
+@pytest.fixture
+def auto_db():
+    return FakeAutoDb()
+
+@pytest.fixture
+def index(auto_db):
+    return PriceIndex.from_connection(StubConnection(auto_db.handler))
+
+# car_index_key(make, model, year)
+def test_key_normalisation():
+    assert car_index_key(' honda', 'Accord ', 2015) == car_index_key('HONDA', 'ACCORD', '2015')
+
+# estimate / estimate_vin / estimate_auction
+def test_estimate_normalises_and_converts_decimals(index):
+    estimate = index.estimate('honda', 'accord', 2015)
+    assert estimate['median_price'] == 15000.5
+    assert isinstance(estimate['max_price'], float)
+    assert index.estimate('FORD', 'F-150', '2013') is None
+
+def test_estimate_vin(index):
+    assert index.estimate_vin('4T1BF1FK5EU123456')['median_price'] == 12000
+    assert index.estimate_vin('1FTFW1ET5DFC10312') is None
+    assert index.estimate_vin('UNKNOWNVIN0000000') is None
+
+def test_estimate_auction(index):
+    results = index.estimate_auction(datetime(2099, 5, 3), 'brooklyn', '1')
+    assert [(lot_number, vin) for lot_number, vin, _ in results] == [('1', '1HGCM82633A004352'), ('2', '4T1BF1FK5EU123456')]
+    assert [estimate['median_price'] for _, _, estimate in results] == [15000.5, 12000]
+    assert index.estimate_auction(date(2099, 5, 4), 'queens', 2) == [('1', '1FTFW1ET5DFC10312', None)]
+
+# refresh()
+def test_refresh_picks_up_changed_aggregate(auto_db, index):
+    auto_db.aggregates[('TOYOTA', 'Camry', '2014')] = (19000, 7500, 13000, 150000, 30000, 80000, T0 + timedelta(hours=1))
+    updated, reloaded_lots = index.refresh()
+    # The Camry row moved past the watermark, the Accord row is re-read within the overlap window
+    assert updated == 2
+    assert reloaded_lots == 0
+    assert index.estimate('TOYOTA', 'Camry', '2014')['median_price'] == 13000
+    assert index.last_updated == T0 + timedelta(hours=1)
+
+def test_refresh_catches_late_commit_below_watermark(auto_db, index):
+    # Transaction started before the last refresh but committed after it
+    auto_db.aggregates[('NISSAN', 'Altima', '2016')] = (16000, 6000, 11000, 140000, 25000, 70000, T0 - timedelta(minutes=5))
+    index.refresh_aggregates()
+    assert index.estimate('NISSAN', 'Altima', '2016')['median_price'] == 11000
+
+def test_refresh_reloads_lots_only_when_changed(auto_db, index):
+    assert index.refresh()[1] == 0
+    auto_db.lots.append(('JN1AZ4EH1DM123456', '3', date(2099, 5, 3), 'brooklyn', 1, 'NISSAN', 'Altima', '2016'))
+    assert index.refresh()[1] == 4
+    assert len(index.estimate_auction('2099-05-03', 'brooklyn', 1)) == 3
+
+def test_load_lots_false_skips_lot_queries(auto_db):
+    index = PriceIndex.from_connection(StubConnection(auto_db.handler), load_lots=False)
+    assert all('FROM car_aggregates' in sql for sql, _ in auto_db.queries)
+    assert index.estimate('HONDA', 'Accord', '2015') is not None
+    assert index.estimate_vin('1HGCM82633A004352') is None
@@ -1,6 +1,10 @@
 
+import json
+from datetime import date
+
 import pytest
 from app.vin_decode import *
+from tests.stubs import StubConnection
 
 # General tests
 def test_invalid_configuration_handling():
@@ -53,3 +57,39 @@ def test_decode_service_unexpected_results():
 def test_full_pipeline():
     pass  # TODO: Implement this test
 
+# create_json()
+class ClosingConnection(StubConnection):
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+def test_create_json_exports_without_car_aggregates(tmp_path, monkeypatch):
+    columns = ['lot_number', 'auction_date', 'borough', 'location_order', 'vin', 'model_year', 'make', 'model']
+    rows = [('1', date(2099, 5, 3), 'brooklyn', 1, '1HGCM82633A004352', '2015', 'HONDA', 'Accord')]
+
+    def handler(sql, params):
+        if 'car_aggregates' in sql:
+            raise Exception('relation "car_aggregates" does not exist')
+        return columns, rows
+
+    conn = ClosingConnection(handler)
+    monkeypatch.setattr(database, 'get_postgres_connection', lambda: conn)
+    (tmp_path / 'app').mkdir()
+    monkeypatch.chdir(tmp_path / 'app')
+
+    assert create_json() is None
+    assert conn.closed
+    with open(tmp_path / 'data' / 'output.json') as f:
+        groups = json.load(f)
+    assert groups[0]['records']['vin'] == ['1HGCM82633A004352']
+    assert groups[0]['records']['estimated_median_price'] == [None]
+
+def test_create_json_returns_connection_on_failure(monkeypatch):
+    def handler(sql, params):
+        raise Exception('connection reset')
+
+    conn = ClosingConnection(handler)
+    monkeypatch.setattr(database, 'get_postgres_connection', lambda: conn)
+    assert create_json() == ('connection reset', 500)
+    assert conn.closed